@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import warnings
 
-import matplotlib.pyplot as plt
 import numpy as np
 import xtrack as xt
 
@@ -22,6 +21,8 @@ def arrange_phase_space_plot():
     ax_norm : matplotlib.axes.Axes
         The axis for the normalized phase space plot.
     """
+    import matplotlib.pyplot as plt
+
     fig, (ax_geom, ax_norm) = plt.subplots(1, 2, figsize=(10, 5), layout="tight")
     ax_geom.set_title("Espace des phases physique")
     ax_norm.set_title("Espace des phases normalisé")
@@ -33,6 +34,8 @@ def arrange_phase_space_plot():
     ax_geom.set_ylabel(r"${p}_x$")
     ax_norm.set_xlabel(r"$\hat{x}$")
     ax_norm.set_ylabel(r"$\hat{p}_x$")
+    # Each axis needs its own locator instance: set_major_locator binds the
+    # locator to the axis, so sharing one would compute ticks for the wrong limits
     for axis in (ax_geom, ax_norm):
         axis.xaxis.set_major_locator(plt.MaxNLocator(5))
         axis.yaxis.set_major_locator(plt.MaxNLocator(5))
@@ -40,9 +43,138 @@ def arrange_phase_space_plot():
     return fig, ax_geom, ax_norm
 
 
+# ----- Tracking helpers ----- #
+
+
+def _reset_particles(particles: xt.Particles, x: np.ndarray) -> None:
+    """
+    Resets an existing particles object in place to fresh on-momentum
+    particles starting at the given horizontal positions, so that it
+    can be tracked again without allocating a new one.
+
+    Parameters
+    ----------
+    particles : xt.Particles
+        The particles object to reset, with as many particles as in `x`.
+    x : np.ndarray
+        The initial horizontal positions of the particles.
+    """
+    particles.x[:] = x
+    for coordinate in (particles.px, particles.y, particles.py, particles.zeta, particles.s):
+        coordinate[:] = 0
+    particles.state[:] = 1  # first, as update_delta only acts on alive particles
+    particles.update_delta(np.zeros(x.size))
+    particles.at_turn[:] = 0
+    particles.at_element[:] = 0
+    particles.particle_id[:] = np.arange(x.size)
+    particles.reorganize()  # updates the active / lost particles bookkeeping
+
+
+def _find_first_unstable(monitor: xt.ParticlesMonitor, x_septum: float) -> int:
+    """
+    Finds the first unstable particle from a turn-by-turn record, in
+    the order the particles were created. Unstable particles are those
+    which went beyond the septum on any of the recorded turns.
+
+    Parameters
+    ----------
+    monitor : xt.ParticlesMonitor
+        The turn-by-turn record of the tracked particles.
+    x_septum : float
+        The horizontal position of the septum.
+
+    Returns
+    -------
+    int
+        The particle_id of the first unstable particle, or the number
+        of particles if they are all stable.
+    """
+    is_unstable = np.append((monitor.x > x_septum).any(axis=1), True)
+    return int(np.argmax(is_unstable))
+
+
+# ----- Coordinates helpers ----- #
+
+
+def _normalize_coordinates(
+    twiss: xt.TwissTable, record: xt.ParticlesMonitor
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Computes the horizontal normalized coordinates of a turn-by-turn record
+    with a single matrix product, using the Courant-Snyder parameters at the
+    start of the line (where records are taken). Unlike the more general
+    `twiss.get_normalized_coordinates`, dispersion and coupling terms are
+    not included: this is only valid for on-momentum (delta=0) tracking in
+    an uncoupled line, which is the case here as the cavity has no voltage.
+
+    Parameters
+    ----------
+    twiss : xt.TwissTable
+        The twiss table of the line.
+    record : xt.ParticlesMonitor
+        The turn-by-turn record of the tracking.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        The x_norm and px_norm arrays, with the same shape as in the record.
+    """
+    sqrt_betx = np.sqrt(twiss.betx[0])
+    w_inv = np.array([[1 / sqrt_betx, 0], [twiss.alfx[0] / sqrt_betx, sqrt_betx]])
+    coords = np.stack([record.x - twiss.x[0], record.px - twiss.px[0]])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        x_norm, px_norm = np.einsum("ij,jkl->ikl", w_inv, coords)
+    return x_norm, px_norm
+
+
 # ----- Phase space characterization ----- #
 
 
+def _find_fixed_points(x_norm: np.ndarray, px_norm: np.ndarray, theta: np.ndarray) -> np.ndarray:
+    """
+    Identifies the three fixed points on the boundary of the stable
+    triangle. The first one has the largest amplitude, and the two
+    others are the local amplitude maxima at +/- 120 degrees from it.
+
+    Parameters
+    ----------
+    x_norm : np.ndarray
+        Normalized x-coordinates of the stable triangle boundary.
+    px_norm : np.ndarray
+        Normalized px-coordinates of the stable triangle boundary.
+    theta : np.ndarray
+        Angles of the boundary points in normalized phase space, which
+        should be sorted in increasing order.
+
+    Returns
+    -------
+    np.ndarray
+        The indices of the three fixed points in the provided arrays.
+    """
+    half_window: float = 0.3  # angular half-width in which to look for the other fixed points
+    r2 = x_norm * x_norm + px_norm * px_norm  # no need for the sqrt to compare amplitudes
+    i_fps = [np.argmax(r2)]
+    for k in (1, -1):
+        # Target angle brought back in [-pi, pi), the window might wrap around
+        theta_target = np.mod(theta[i_fps[0]] + k * 2 / 3 * np.pi + np.pi, 2 * np.pi) - np.pi
+        windows = [(theta_target - half_window, theta_target + half_window)]
+        if theta_target - half_window < -np.pi:
+            windows.append((theta_target - half_window + 2 * np.pi, np.pi))
+        elif theta_target + half_window > np.pi:
+            windows.append((-np.pi, theta_target + half_window - 2 * np.pi))
+        # Since theta is sorted, each window is a contiguous slice
+        i_fp, r2_fp = 0, -np.inf
+        for theta_low, theta_high in windows:
+            i_low, i_high = np.searchsorted(theta, [theta_low, theta_high])
+            if i_high > i_low:
+                i_max = i_low + np.argmax(r2[i_low:i_high])
+                if r2[i_max] > r2_fp:
+                    i_fp, r2_fp = i_max, r2[i_max]
+        i_fps.append(i_fp)
+    return np.array(i_fps)
+
+
 def characterize_phase_space(line: xt.Line, plot: bool = True) -> dict[str, float | np.ndarray]:
     """
     Characterizes the phase space of a beam in both physical and
@@ -74,112 +206,127 @@ def characterize_phase_space(line: xt.Line, plot: bool = True) -> dict[str, floa
     twiss: xt.TwissTable = line.twiss4d()  # no need for 6D
     x_septum: float = 3.5e-2
     num_turns: int = 1000
+    num_turns_quick: int = 200  # turns of the first search pass, see below
+    num_intervals: int = 16  # search region is split in this many intervals at each iteration
     # ---------------------------------------------------------------
-    # Now let's binary search for the separatrix via tracking
+    # Now let's search for the separatrix via tracking. Rather than a
+    # serial binary search, we track a batch of candidates spread over
+    # the search region in a single call and keep the interval where
+    # the first unstable candidate appears. The same particles object
+    # is reset and reused at every iteration.
     x_stable, x_unstable = 0, 0.03
+    p = line.build_particles(x=np.zeros(num_intervals - 1), px=0)
     while x_unstable - x_stable > 1e-6:
-        x_test = (x_stable + x_unstable) / 2
-        p = line.build_particles(x=x_test, px=0)
-        line.track(p, num_turns=num_turns, turn_by_turn_monitor=True)
-        rec_test = line.record_last_track
-        # Update the search region after tracking
-        if (rec_test.x > x_septum).any():  # Unstable part, separatrix is on the right of x_test
-            x_unstable = x_test
-        else:  # Stable part, separatrix is on the left of x_test
-            x_stable = x_test
+        x_bounds = np.linspace(x_stable, x_unstable, num_intervals + 1)
+        x_tests = x_bounds[1:-1]  # the edges are already known to be stable / unstable
+        _reset_particles(p, x_tests)
+        # Our own monitor spans all turns, so it keeps recording when tracking resumes below
+        monitor = xt.ParticlesMonitor(
+            start_at_turn=0, stop_at_turn=num_turns, num_particles=x_tests.size
+        )
+        # A first pass over a few turns already settles the candidates that
+        # cross the septum early. Those beyond the first of them can not change
+        # the outcome, so we stop them and only keep tracking the others for
+        # the remaining turns (the verdict is the same as for a full tracking)
+        line.track(p, num_turns=num_turns_quick, turn_by_turn_monitor=monitor)
+        i_first_unstable = _find_first_unstable(monitor, x_septum)
+        if i_first_unstable > 0:
+            p.state[p.particle_id >= i_first_unstable] = 0
+            p.reorganize()
+            line.track(p, num_turns=num_turns - num_turns_quick, turn_by_turn_monitor=monitor)
+            i_first_unstable = _find_first_unstable(monitor, x_septum)
+        # Update the search region: the separatrix is between the last
+        # stable candidate and the first unstable one (or the edge)
+        x_stable, x_unstable = x_bounds[i_first_unstable], x_bounds[i_first_unstable + 1]
     # ---------------------------------------------------------------
-    # Track a particle juuust beyond the limit of stability
-    # will give us a good approximation of the separatrix
-    p = line.build_particles(x=x_unstable, px=0)
+    # Track a particle juuust beyond the limit of stability, which
+    # will give us a good approximation of the separatrix, and one
+    # just bellow it to identify the stable area. Both are tracked
+    # in a single call and are rows 0 and 1 of the record.
+    p = line.build_particles(x=[x_unstable, x_stable], px=0)
     line.track(p, num_turns=num_turns, turn_by_turn_monitor=True)
-    rec_separatrix = line.record_last_track
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore", category=RuntimeWarning)
-        norm_separatrix = twiss.get_normalized_coordinates(rec_separatrix)
+    rec_limits = line.record_last_track
+    x_norm_limits, px_norm_limits = _normalize_coordinates(twiss, rec_limits)
+    x_separ, px_separ = rec_limits.x[0, :], rec_limits.px[0, :]
+    x_norm_separ, px_norm_separ = x_norm_limits[0, :], px_norm_limits[0, :]
     # ---------------------------------------------------------------
     # Get the separatrix slope at the septum location
-    x_separ, px_separ = rec_separatrix.x[0, :], rec_separatrix.px[0, :]
-    i_septum: int = np.argmin(np.abs(x_separ - x_septum))
-    lims_x_separ = [x_separ[i_septum - 3], x_separ[i_septum + 3]]
-    lims_px_separ = [px_separ[i_septum - 3], px_separ[i_septum + 3]]
-    poly_sep = np.polyfit(lims_x_separ, lims_px_separ, deg=1)
-    dpx_dx_at_septum: float = poly_sep[0]
+    distance_to_septum = x_separ - x_septum
+    i_septum: int = np.argmin(np.abs(distance_to_septum, out=distance_to_septum))
+    # Line through the previous and next passages on this branch (3 turns apart)
+    x_before, x_after = x_separ[i_septum - 3], x_separ[i_septum + 3]
+    px_before, px_after = px_separ[i_septum - 3], px_separ[i_septum + 3]
+    dpx_dx_at_septum: float = (px_after - px_before) / (x_after - x_before)
+    poly_sep = np.array([dpx_dx_at_septum, px_before - dpx_dx_at_septum * x_before])
     # ---------------------------------------------------------------
-    # Identify stable area by tracking a particle just bellow the limit of stability
-    p = line.build_particles(x=x_stable, px=0)
-    line.track(p, num_turns=num_turns, turn_by_turn_monitor=True)
-    rec_triangle = line.record_last_track
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore", category=RuntimeWarning)
-        nc_triangle = twiss.get_normalized_coordinates(rec_triangle)
-    x_triangle = rec_triangle.x[0, :]
-    px_triangle = rec_triangle.px[0, :]
-    x_norm_triangle = nc_triangle.x_norm[0, :]
-    px_norm_triangle = nc_triangle.px_norm[0, :]
-    theta_triangle = np.angle(x_norm_triangle + 1j * px_norm_triangle)
+    # Identify stable area from the particle just bellow the limit of stability
+    theta_triangle = np.arctan2(px_norm_limits[1, :], x_norm_limits[1, :])
     i_sorted = np.argsort(theta_triangle)
-    x_triangle = x_triangle[i_sorted]
-    px_triangle = px_triangle[i_sorted]
-    x_norm_triangle = x_norm_triangle[i_sorted]
-    px_norm_triangle = px_norm_triangle[i_sorted]
+    theta_triangle = theta_triangle[i_sorted]
+    # Reorder the coordinates by increasing theta, gathering straight from the record rows
+    x_triangle = rec_limits.x[1, i_sorted]
+    px_triangle = rec_limits.px[1, i_sorted]
+    x_norm_triangle = x_norm_limits[1, i_sorted]
+    px_norm_triangle = px_norm_limits[1, i_sorted]
     # ---------------------------------------------------------------
     # Identify the fixed points in both coordinate systems
-    z_triangle = rec_triangle.x[0, :] + 1j * rec_triangle.px[0, :]
-    z_triangle_norm = nc_triangle.x_norm[0, :] + 1j * nc_triangle.px_norm[0, :]
-    r_triangle_norm = np.abs(z_triangle_norm)
-    i_fp1 = np.argmax(r_triangle_norm)
-    z_fp1 = z_triangle_norm[i_fp1]
-    r_fp1 = np.abs(z_fp1)
-    mask_fp2 = np.abs(z_triangle_norm - z_fp1 * np.exp(1j * 2 / 3 * np.pi)) < 0.2 * r_fp1
-    i_fp2 = np.argmax(r_triangle_norm * mask_fp2)
-    mask_fp3 = np.abs(z_triangle_norm - z_fp1 * np.exp(-1j * 2 / 3 * np.pi)) < 0.2 * r_fp1
-    i_fp3 = np.argmax(r_triangle_norm * mask_fp3)
-    x_fp = z_triangle[[i_fp1, i_fp2, i_fp3]].real
-    px_fp = z_triangle[[i_fp1, i_fp2, i_fp3]].imag
-    x_norm_fp = z_triangle_norm[[i_fp1, i_fp2, i_fp3]].real
-    px_norm_fp = z_triangle_norm[[i_fp1, i_fp2, i_fp3]].imag
+    i_fps = _find_fixed_points(x_norm_triangle, px_norm_triangle, theta_triangle)
+    x_fp = x_triangle[i_fps]
+    px_fp = px_triangle[i_fps]
+    x_norm_fp = x_norm_triangle[i_fps]
+    px_norm_fp = px_norm_triangle[i_fps]
     # ---------------------------------------------------------------
-    # Compute the stable region area
-    stable_area = np.linalg.det([x_norm_fp, px_norm_fp, [1, 1, 1]])
+    # Compute the stable region area. This is the closed form of the determinant
+    # det([x_norm_fp, px_norm_fp, [1, 1, 1]]), i.e. twice the signed triangle area
+    stable_area: float = (x_norm_fp[1] - x_norm_fp[0]) * (px_norm_fp[2] - px_norm_fp[0]) - (
+        x_norm_fp[2] - x_norm_fp[0]
+    ) * (px_norm_fp[1] - px_norm_fp[0])
     # ---------------------------------------------------------------
     # Plot the phase space with all this info if requested
     if plot is True:
+        import matplotlib.pyplot as plt  # imported here to keep headless use cheap
+        from matplotlib.collections import LineCollection
+
         # ---------------------------------------------------------------
         # We now get the phase space itself by tracking more particles
         x_gen = np.linspace(0, 1.1 * x_stable, 20)
         parts = line.build_particles(x=x_gen, px=0, y=0, py=0, zeta=0, delta=0)
         line.track(parts, num_turns=1000, turn_by_turn_monitor=True)
         record = line.record_last_track
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", category=RuntimeWarning)
-            norm_coords = twiss.get_normalized_coordinates(record)
+        x_norm_record, px_norm_record = _normalize_coordinates(twiss, record)
         fig, ax_geom, ax_norm = arrange_phase_space_plot()
         ymin, ymax = ax_geom.get_ylim()
-        ax_geom.plot(record.x.T, record.px.T, ".", markersize=1, color="C0")
-        ax_norm.plot(norm_coords.x_norm.T, norm_coords.px_norm.T, ".", markersize=1, color="C0")
+        # Single (rasterized) artist per axis for the whole point cloud
+        ax_geom.plot(
+            record.x.T.ravel(),
+            record.px.T.ravel(),
+            ".",
+            markersize=1,
+            color="C0",
+            rasterized=True,
+        )
+        ax_norm.plot(
+            x_norm_record.T.ravel(),
+            px_norm_record.T.ravel(),
+            ".",
+            markersize=1,
+            color="C0",
+            rasterized=True,
+        )
         ax_geom.axvline(x=x_septum, color="k", alpha=0.4, linestyle="--")
         ax_geom.text(
             x_septum * 0.98, ymax * 0.95, "Septum", rotation=90, va="top", ha="right", alpha=0.5, c="k"
         )
-        # Add the determined separatrix
-        mask_alive = rec_separatrix.state > 0
-        for ii in range(3):
-            ax_geom.plot(
-                rec_separatrix.x[mask_alive][ii::3],
-                rec_separatrix.px[mask_alive][ii::3],
-                "-",
-                lw=2,
-                color="C1",
-                alpha=0.9,
-            )
-            ax_norm.plot(
-                norm_separatrix.x_norm[mask_alive][ii::3],
-                norm_separatrix.px_norm[mask_alive][ii::3],
-                "-",
-                lw=2,
-                color="C1",
-                alpha=0.9,
-            )
+        # Add the determined separatrix, its three branches in a single collection per axis
+        mask_alive = rec_limits.state[0, :] > 0
+        x_alive, px_alive = x_separ[mask_alive], px_separ[mask_alive]
+        x_norm_alive, px_norm_alive = x_norm_separ[mask_alive], px_norm_separ[mask_alive]
+        branches = [np.column_stack([x_alive[ii::3], px_alive[ii::3]]) for ii in range(3)]
+        branches_norm = [
+            np.column_stack([x_norm_alive[ii::3], px_norm_alive[ii::3]]) for ii in range(3)
+        ]
+        ax_geom.add_collection(LineCollection(branches, linewidths=2, colors="C1", alpha=0.9))
+        ax_norm.add_collection(LineCollection(branches_norm, linewidths=2, colors="C1", alpha=0.9))
         # Add the separatrix slope at the septum
         intervale_x_pente = [x_septum - 1e-2, x_septum + 1e-2]
         ax_geom.plot(intervale_x_pente, np.polyval(poly_sep, intervale_x_pente), "--k", linewidth=2)